@@ -59,7 +59,7 @@ import numpy as np
 import scipy as sp
 from scipy import inf
 import scipy.sparse.linalg
-from scipy.sparse import dok_matrix
+from scipy.sparse import coo_matrix
 
 # Sage objects: Rings and Polynomials
 from sage.rings.integer import Integer
@@ -167,8 +167,8 @@ def get_Fj_from_model(model_filename=None, f=None, n=None, k=None):
     if got_model_by_filename:
         [f, n, k] = load_model(model_filename)
 
-    # create the collection of sparse matrices Fj
-    F = [dok_matrix((n, n**i), dtype=np.float64) for i in range(1, k+1)]
+    # nonzero entries of each Fj, stored as (rows, columns, values)
+    entries = [([], [], []) for i in range(k)]
 
     # read the powers appearing in each monomial
     try:
@@ -185,9 +185,11 @@ def get_Fj_from_model(model_filename=None, f=None, n=None, k=None):
         for i, dictionary_f_i in enumerate(dictionary_f):
             for key, value in dictionary_f_i.items():
                 row = i
-                j = sum(key)
-                column = get_index_from_key(list(key), j, n)
-                F[j-1][(row, column)] = value
+                j = key.unweighted_degree()
+                column = get_index_from_key(key, j, n)
+                entries[j-1][0].append(row)
+                entries[j-1][1].append(column)
+                entries[j-1][2].append(value)
 
     elif (n==1):
         #the scalar case is treated separately. the problem arises from using
@@ -197,12 +199,14 @@ def get_Fj_from_model(model_filename=None, f=None, n=None, k=None):
                 row = i
                 j = key
                 column = 0  # because Fj are 1x1 in the scalar case
-        
-                # Create a dictionary with the update
-                update_dict = {(row, column): value}
-        
-                # Update the corresponding DOK matrix with the dictionary
-                F[int(j) - 1].update(update_dict)
+                entries[int(j)-1][0].append(row)
+                entries[int(j)-1][1].append(column)
+                entries[int(j)-1][2].append(value)
+
+    # create the collection of sparse matrices Fj, each one assembled in a single
+    # call instead of assigning the entries of a DOK matrix one by one
+    F = [coo_matrix((values, (rows, columns)), shape=(n, n**(i+1)), dtype=np.float64).todok()
+         for i, (rows, columns, values) in enumerate(entries)]
 
     return F, n, k
 
@@ -258,7 +262,7 @@ def solve_ode_exp(AN, x0, N, tini=0, T=1, NPOINTS=100):
 
     INPUT:
 
-    - ``AN`` -- matrix, it can be Sage dense or NumPy sparse in COO format
+    - ``AN`` -- matrix, it can be Sage dense, NumPy dense or NumPy sparse in COO format
 
     - ``x0`` -- vector, initial point
 
@@ -272,8 +276,12 @@ def solve_ode_exp(AN, x0, N, tini=0, T=1, NPOINTS=100):
 
     OUTPUT:
 
-    List containing the solution of the 1st order ODE `x'(t) = A_N x(t)`, with initial 
-    condition `x(0) = x_0`. The solution is computed the matrix exponential `e^{A_N t_i}` directly.
+    The solution of the 1st order ODE `x'(t) = A_N x(t)`, with initial
+    condition `x(0) = x_0`, sampled at ``NPOINTS`` equally spaced times. If ``AN``
+    is a Sage matrix, it is a list of vectors, and the solution is computed with the
+    matrix exponential directly. If ``AN`` is a NumPy array or a SciPy sparse matrix,
+    it is a NumPy array of shape ``(NPOINTS, dim)``, where each row is the solution
+    at one time point.
 
     NOTES:
 
@@ -310,19 +318,28 @@ def solve_ode_exp(AN, x0, N, tini=0, T=1, NPOINTS=100):
         sage: AN_dense = matrix(AN_sparse.toarray())
         sage: ans = solve_ode_exp(AN_dense, x0=[0.1], N=4, tini=0, \
                     T=1, NPOINTS=20)
+
+    A dense NumPy array is solved with the same method as the sparse matrix,
+    without converting it to a Sage matrix::
+
+        sage: ans = solve_ode_exp(AN_sparse.toarray(), x0=[0.1], N=4, tini=0, \
+                    T=1, NPOINTS=20)
     """
     # transform to [x0, x0^[2], ..., x0^[N]]
-    y0 = vector(lift(x0, N))
+    y0 = lift(x0, N)
 
     # compute solution
     if "sage.matrix" in str(type(AN)):
+        y0 = vector(y0)
         #t_dom = [tini + (T-tini)/(NPOINTS-1)*i for i in range(NPOINTS)]
         t_dom = np.linspace(tini, T, num=NPOINTS)
         sol = [AN.exp() * np.exp(ti) * y0 for ti in t_dom]
 
-    elif "scipy.sparse" in str(type(AN)):
+    elif "scipy.sparse" in str(type(AN)) or "numpy.ndarray" in str(type(AN)):
         from scipy.sparse.linalg import expm_multiply
-        sol = expm_multiply(AN, np.array(y0), start=tini, stop=T, \
+        # convert the whole initial vector in a single call
+        y0 = np.array(y0, dtype=np.float64)
+        sol = expm_multiply(AN, y0, start=tini, stop=T, \
                             num=NPOINTS, endpoint=True)
 
     else:
@@ -384,7 +401,8 @@ def plot_truncated(model, N, x0, tini, T, NPOINTS, xcoord=0, ycoord=1, **kwargs)
 
     # solve the linea ODE using SciPy's sparse matrix solver
     sol = solve_ode_exp(AN, x0, N, tini=tini, T=T, NPOINTS=NPOINTS)
-    sol_x1 = [sol[i][xcoord] for i in range(NPOINTS)]
-    sol_x2 = [sol[i][ycoord] for i in range(NPOINTS)]
+    # the solution is an array of shape (NPOINTS, dim), so slice the columns
+    sol_x1 = sol[:, xcoord]
+    sol_x2 = sol[:, ycoord]
 
     return list_plot(zip(sol_x1, sol_x2), plotjoined=True, **kwargs)
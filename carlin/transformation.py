@@ -36,6 +36,7 @@ Kronecker power and linear algebra
     :func:`~kron_prod`            | Compute the Kronecker product of x and y
     :func:`~kron_power`           | Receives a `n\times 1` vector and computes its Kronecker power `x^{[i]}`
     :func:`~log_norm`             | Compute the logarithmic norm of a matrix
+    :func:`~polyhedron_sup_norm`  | Maximum norm of any element in a polyhedron, with respect to the supremum norm
 
 Error computation
 ~~~~~~~~~~~~~~~~~~~~
@@ -130,11 +131,15 @@ def transfer_matrices(N, F, n, k):
     # first row is trivial
     A.append(F)
 
+    # the identity blocks only depend on the row, not on j
+    In = eye(n, format='csr')
+
     for i in range(1, N):
+        Ini = eye(n**i, format='csr')
         newRow = []
         for j in range(k):
-            L = kron(A[i-1][j], eye(n))
-            R = kron(eye(n**i), F[j])
+            L = kron(A[i-1][j], In, format='csr')
+            R = kron(Ini, F[j], format='csr')
             newRow += [np.add(L, R)]
         A.append(newRow)
 
@@ -217,13 +222,8 @@ def truncated_matrix(N, *args, **kwargs):
         n3_i = max(N-i-k, 0)
         n2_i = N-i-n3_i
 
-        newBlockRow = A[i][0:n2_i]
-
-        for j in range(i):
-            newBlockRow.insert(0, None)
-
-        for j in range(n3_i):
-            newBlockRow.append(None)
+        # pad with zero blocks on both sides of the nonzero part of the block row
+        newBlockRow = [None]*i + A[i][0:n2_i] + [None]*n3_i
 
         AN_list.append(newBlockRow)
 
@@ -296,21 +296,20 @@ def quadratic_reduction(F, n, k):
         [ 0.0 -1.0  0.0  0.0]
         [ 0.0  0.0  0.0 -2.0]
     """
-    from scipy.sparse import bmat, lil_matrix
+    from scipy.sparse import bmat, coo_matrix
 
     A = transfer_matrices(k-1, F, n, k)
 
     # LINEAR PART
     F1_tilde_list = []
     for i in range(k-1):
-        newRow = A[i][0:k-i-1]
-        for j in range(i):
-            newRow.insert(0, None)
+        newRow = [None]*i + A[i][0:k-i-1]
         F1_tilde_list.append(newRow)
 
     F1_tilde = bmat(F1_tilde_list)
 
     # QUADRATIC PART
+    # the zero blocks are empty COO matrices, the format used internally by bmat
     F2_tilde_list = []
 
     for i in range(k-1):
@@ -318,10 +317,10 @@ def quadratic_reduction(F, n, k):
         for h in range(k-1):
 
             for j in range(k-2):
-                newRow.append(lil_matrix((n**(i+1), n**(h+j+2))))
+                newRow.append(coo_matrix((n**(i+1), n**(h+j+2))))
 
             if h>i:
-                newRow.append(lil_matrix((n**(i+1), n**(h+k))))
+                newRow.append(coo_matrix((n**(i+1), n**(h+k))))
             else:
                 newRow.append(A[i][k-i-1+h])
 
@@ -380,10 +379,8 @@ def error_function(model, N, x0):
 
     norm_F1_tilde, norm_F2_tilde = ch['norm_Fi_inf']
 
-    x0_hat = [kron_power(x0, i+1) for i in range(k-1)]
-
-    #transform to flat list
-    x0_hat = [item for sublist in x0_hat for item in sublist]
+    #flat list [x0, x0^[2], ..., x0^[k-1]]
+    x0_hat = lift(x0, k-1)
 
     norm_x0_hat = norm(x0_hat, ord=inf)
     beta0 = ch['beta0_const']*norm_x0_hat
@@ -447,8 +444,27 @@ def linearize(model, target_filename, N, x0, **kwargs):
     This function is self-contained; it transforms to canonical quadratic form, then
     computes Carleman linearization together with the error estimates and exports the resulting
     matrix `A_N` and characteristics to a MAT file.
+
+    EXAMPLES:
+
+    Linearize the Van der Pol oscillator with a box of initial states, and export
+    the result to a temporary MAT file::
+
+        sage: from carlin.transformation import linearize
+        sage: from carlin.library import vanderpol
+        sage: X0 = Polyhedron(vertices=[[-1/2, -1/2], [-1/2, 1/2], [1/2, -1/2], [1/2, 1/2]])
+        sage: filename = tmp_filename(ext='.mat')
+        sage: linearize(vanderpol(1, 1), filename, 2, X0)  # random
+        sage: from scipy.io import loadmat
+        sage: dic = loadmat(filename)
+        sage: float(dic['norm_x0_tilde'])
+        0.5
     """
 
+    # fail before computing the linearization if the initial set is empty
+    if 'polyhedron' in str(type(x0)) and x0.is_empty():
+        raise ValueError('the initial set x0 should not be empty')
+
     dic = dict()
     dic['model_name'] = model
     dic['N'] = N
@@ -490,9 +506,7 @@ def linearize(model, target_filename, N, x0, **kwargs):
     dic['log_norm_F1_inf'] = ch['log_norm_F1_inf']
 
     if 'polyhedron' in str(type(x0)):
-        from polyhedron_tools.misc import radius, polyhedron_to_Hrep
-        [Fx0, gx0] = polyhedron_to_Hrep(x0)
-        norm_initial_states = radius([Fx0, gx0])
+        norm_initial_states = polyhedron_sup_norm(x0)
         if (norm_initial_states >= 1):
             norm_x0_hat = norm_initial_states**(k-1)
         elif (norm_initial_states < 1):
@@ -523,9 +537,10 @@ def linearize(model, target_filename, N, x0, **kwargs):
         #x0_hat = [item for sublist in x0_hat for item in sublist]
         #norm_x0_hat = np.linalg.norm(x0_hat, ord=inf)
 
-        #use crossnorm property
+        #use crossnorm property; since nx0**i is monotone in i, the maximum
+        #over i = 1, ..., k-1 is attained at one of the endpoints
         nx0 = np.linalg.norm(x0, ord=inf)
-        norm_x0_hat = max([nx0**i for i in range(1, k)])
+        norm_x0_hat = max(nx0, nx0**(k-1))
 
         dic['norm_x0_tilde'] = norm_x0_hat
 
@@ -570,8 +585,9 @@ def characteristics(F, n, k, ord=inf):
 
     INPUT:
 
-    - ``F`` -- list of matrices in some NumPy sparse format, for which the 
-      ``toarray`` method is available
+    - ``F`` -- list of matrices in some SciPy sparse format. The supremum norm is
+      computed from the absolute row sums of the sparse matrices; for other norms
+      the ``toarray`` method should be available
 
     - ``n`` -- dimension on state-space
 
@@ -583,10 +599,29 @@ def characteristics(F, n, k, ord=inf):
     OUTPUT:
 
     Dictionary ``c`` containing ``norm_Fi_inf``, ``log_norm_F1_inf`` and ``beta0_const``.
+
+    EXAMPLES:
+
+    The supremum norms agree with those of the dense matrices, even if the
+    sparse matrices contain duplicate entries::
+
+        sage: from carlin.transformation import characteristics
+        sage: import numpy as np
+        sage: from scipy.sparse import coo_matrix
+        sage: F1 = coo_matrix(([1., -3., 2.], ([0, 0, 1], [0, 0, 1])), shape=(2, 2))
+        sage: F2 = coo_matrix(([4., -1.], ([0, 1], [1, 3])), shape=(2, 4))
+        sage: c = characteristics([F1, F2], 2, 2)
+        sage: c['norm_Fi_inf'] == [np.linalg.norm(Fi.toarray(), ord=np.inf) for Fi in [F1, F2]]
+        True
     """
     c = dict()
 
-    c['norm_Fi_inf'] = [norm(F[i].toarray(), ord=ord) for i in range(k)]
+    if ord == inf:
+        # largest absolute row sum, computed without densifying the matrices;
+        # the conversion to CSR sums duplicate entries before taking abs
+        c['norm_Fi_inf'] = [np.asarray(abs(F[i].tocsr()).sum(axis=1)).max() for i in range(k)]
+    else:
+        c['norm_Fi_inf'] = [norm(F[i].toarray(), ord=ord) for i in range(k)]
 
     if ord == inf:
         c['log_norm_F1_inf'] = log_norm(F[0], p='inf')
@@ -17,11 +17,11 @@ import scipy.sparse.linalg
 from polyhedron_tools.misc import polyhedron_to_Hrep, chebyshev_center, radius
 
 # Sage objects: Rings, Polynomials, Linear algebra and all that
-from sage.rings.all import RR, QQ
+from sage.rings.all import RR, QQ, CC
+from sage.rings.infinity import oo
 from sage.rings.real_double import RDF
-from sage.rings.polynomial.polynomial_ring import polygens
 from sage.modules.free_module_element import vector
-from sage.functions.other import real_part, imag_part
+from sage.functions.other import real_part
 from sage.functions.log import log, exp
 from sage.rings.polynomial.polydict import ETuple
 
@@ -56,6 +56,12 @@ def get_key_from_index(i, j, n):
 
     - ``n`` -- integer, number of dimensions
 
+    NOTES:
+
+    - The element in position `i` of `x^{[j]}` is the product of the variables
+      indexed by the `j` digits of `i` written in base `n`, hence the key is obtained
+      by counting these digits, without computing the Kronecker power.
+
     EXAMPLES:
 
     Take `x^{[2]}` for `x=(x_1, x_2)` and compute the exponent vector of the element
@@ -64,11 +70,34 @@ def get_key_from_index(i, j, n):
         sage: from carlin.transformation import get_key_from_index
         sage: get_key_from_index(1, 2, 2)
         [1, 1]
+
+    TESTS:
+
+    The index should be smaller than the length `n^j` of the Kronecker power::
+
+        sage: get_key_from_index(4, 2, 2)
+        Traceback (most recent call last):
+        ...
+        ValueError: the index i should satisfy 0 <= i < n^j
+
+    The order of the Kronecker power should be positive::
+
+        sage: get_key_from_index(0, 0, 2)
+        Traceback (most recent call last):
+        ...
+        ValueError: index j should be an integer >= 1
     """
-    x = polygens(QQ, ['x'+str(1+k) for k in range(n)])
-    x_power_j = kron_power(x, j)
-    d = x_power_j[i].dict()
-    return list(d.items()[0][0])
+    if j < 1:
+        raise ValueError('index j should be an integer >= 1')
+
+    if not 0 <= i < n**j:
+        raise ValueError('the index i should satisfy 0 <= i < n^j')
+
+    key = [0]*n
+    for _ in range(j):
+        i, digit = divmod(i, n)
+        key[digit] += 1
+    return key
 
 def get_index_from_key(key, j, n):
     r"""
@@ -76,8 +105,8 @@ def get_index_from_key(key, j, n):
 
     INPUT:
 
-    - ``key`` -- list or tuple, key corresponding to the exponent vector in the
-      Kronecker power
+    - ``key`` -- list, tuple or ``ETuple``, key corresponding to the exponent vector
+      in the Kronecker power
 
     - ``j`` -- integer, order of the Kronecker power
 
@@ -87,6 +116,10 @@ def get_index_from_key(key, j, n):
 
     - We assume `n \geq 2`. Notice that if `n=1`, we would return always that ``first_occurence = 0``.
 
+    - The first occurrence corresponds to the index whose `j` digits in base `n`
+      are the variables of the monomial sorted in increasing order, hence it is
+      computed directly without enumerating the Kronecker power.
+
     EXAMPLES:
 
     Take `x^{[2]}` for `x=(x_1, x_2)` and compute retrive the first ocurrence of
@@ -95,15 +128,48 @@ def get_index_from_key(key, j, n):
         sage: from carlin.transformation import get_index_from_key
         sage: get_index_from_key([1, 1], 2, 2)
         1
+
+    The key can also be given as an ``ETuple``, as returned by the ``dict`` method
+    of multivariate polynomials::
+
+        sage: from sage.rings.polynomial.polydict import ETuple
+        sage: get_index_from_key(ETuple([0, 2, 1]), 3, 3)
+        14
+
+    TESTS:
+
+    The total degree of the key should be equal to the order `j`::
+
+        sage: get_index_from_key([2, 1], 2, 2)
+        Traceback (most recent call last):
+        ...
+        ValueError: the key should be an exponent vector of total degree j
+
+    Constant terms have no position in a Kronecker power::
+
+        sage: get_index_from_key([0, 0], 0, 2)
+        Traceback (most recent call last):
+        ...
+        ValueError: index j should be an integer >= 1
     """
-    key_as_ETuple = ETuple(key)
-    x = polygens(QQ, ['x'+str(1+k) for k in range(n)])
-    x_power_j = kron_power(x, j)
+    if j < 1:
+        raise ValueError('index j should be an integer >= 1')
 
-    for i, monomial in enumerate(x_power_j):
-        if list(monomial.dict().keys())[0] == key_as_ETuple:
-            first_occurence = i
-            break
+    if isinstance(key, ETuple):
+        # only visit the variables that appear in the monomial
+        degree = key.unweighted_degree()
+        nonzero_exponents = key.sparse_iter()
+    else:
+        degree = sum(key)
+        nonzero_exponents = enumerate(key)
+
+    if degree != j:
+        raise ValueError('the key should be an exponent vector of total degree j')
+
+    first_occurence = 0
+    for variable, exponent in nonzero_exponents:
+        for _ in range(exponent):
+            first_occurence = first_occurence*n + variable
 
     return first_occurence
 
@@ -141,9 +207,38 @@ def kron_power(x, i):
         raise ValueError('index i should be an integer >= 1')
 
 def lift(x0, N):
-    y0 = kron_power(x0, 1)
+    r""" Compute the lifted vector `(x_0, x_0^{[2]}, \ldots, x_0^{[N]})`.
+
+    INPUT:
+
+    - ``x0`` -- list, vector or NumPy array
+
+    - ``N`` -- integer, order of the truncation
+
+    OUTPUT:
+
+    A list with the concatenation of the Kronecker powers of ``x0`` up to order `N`.
+
+    EXAMPLES::
+
+        sage: from carlin.utils import lift
+        sage: lift([1, 2], 2)
+        [1, 2, 1, 2, 2, 4]
+
+    The initial point can also be given as a Sage vector or as a NumPy array::
+
+        sage: lift(vector(QQ, [1, 2]), 3) == lift([1, 2], 3)
+        True
+        sage: import numpy as np
+        sage: lift(np.array([1., 2.]), 3) == lift([1, 2], 3)
+        True
+    """
+    x0_power_i = kron_power(x0, 1)
+    y0 = list(x0_power_i)
     for i in range(2, N+1):
-        y0 = y0 + kron_power(x0, i)
+        # x0^[i] = x0 \otimes x0^[i-1], so reuse the previous power
+        x0_power_i = kron_prod(x0, x0_power_i)
+        y0.extend(x0_power_i)
     return y0
 
 #===============================================
@@ -156,43 +251,161 @@ def log_norm(A, p='inf'):
 
     INPUT:
 
-    - ``A`` -- a rectangular (Sage dense) matrix of order `n`. The coefficients can be either real or complex
+    - ``A`` -- a rectangular matrix of order `n`. The coefficients can be either real or complex.
+      It can be a Sage dense matrix, a NumPy array, or a SciPy sparse matrix; for the latter
+      two only ``p=1`` and ``p='inf'`` are supported, and they are computed with vectorized
+      NumPy reductions
 
     - ``p`` -- (default: ``'inf'``). The vector norm; possible choices are ``1``, ``2``, or ``'inf'``
 
     OUTPUT:
 
     - ``lognorm`` -- the log-norm of `A` in the `p`-norm
+
+    EXAMPLES:
+
+    The log-norm associated to the `1`-norm, for matrices over ``QQ`` and ``RR``::
+
+        sage: from carlin.utils import log_norm
+        sage: A = matrix(QQ, [[-1, 4], [1, -3]])
+        sage: log_norm(A, p=1)
+        1
+        sage: log_norm(A.change_ring(RR), p=1)
+        1.00000000000000
+
+    For an exact base ring the `2`-norm is computed exactly::
+
+        sage: log_norm(matrix(QQ, [[-1, 4], [0, -1]]), p=2)
+        1
+
+    For matrices over ``RR`` or ``CC`` the `2`-norm is computed numerically,
+    from the largest eigenvalue of the Hermitian part of `A`::
+
+        sage: log_norm(matrix(RR, [[-1, 4], [0, -1]]), p=2)  # abs tol 1e-12
+        1.0
+        sage: log_norm(matrix(CC, [[1, 2*I], [0, 1]]), p=2)  # abs tol 1e-12
+        2.0
+
+    NumPy arrays and SciPy sparse matrices give the same result as the Sage matrix::
+
+        sage: B = matrix(RDF, [[-1, 4], [1, -3]])
+        sage: log_norm(B)
+        3.0
+        sage: log_norm(B.numpy()) == log_norm(B)
+        True
+        sage: from scipy.sparse import csr_matrix
+        sage: log_norm(csr_matrix(B.numpy())) == log_norm(B)
+        True
+        sage: log_norm(csr_matrix(B.numpy()), p=1) == log_norm(B, p=1)
+        True
+
+    The `2`-norm is not available for them::
+
+        sage: log_norm(B.numpy(), p=2)
+        Traceback (most recent call last):
+        ...
+        NotImplementedError: the 2-norm is only implemented for Sage matrices
     """
 
     # parse the input matrix
     if 'scipy.sparse' in str(type(A)):
-        # cast into numpy array (or ndarray)
-        A = A.toarray()
+        # kept in sparse format, the row and column sums below do not densify it;
+        # the conversion to CSR sums duplicate entries before taking abs
+        A = A.tocsr()
         n = A.shape[0]
+        is_numpy = True
     elif 'numpy.array' in str(type(A)) or 'numpy.ndarray' in str(type(A)):
         n = A.shape[0]
+        is_numpy = True
     else:
         # assuming sage matrix
         n = A.nrows();
+        is_numpy = False
 
     # computation, depending on the chosen norm p
     if (p == 'inf' or p == oo):
+        if is_numpy:
+            # vectorized over the rows of A
+            d = A.diagonal()
+            return np.max(np.real(d) + np.asarray(abs(A).sum(axis=1)).ravel() - np.abs(d))
+
         z = max( real_part(A[i][i]) + sum( abs(A[i][j]) for j in range(n)) - abs(A[i][i]) for i in range(n))
         return z
 
     elif (p == 1):
-        n = A.nrows();
+        if is_numpy:
+            # vectorized over the columns of A
+            d = A.diagonal()
+            return np.max(np.real(d) + np.asarray(abs(A).sum(axis=0)).ravel() - np.abs(d))
+
         return max( real_part(A[j][j]) + sum( abs(A[i][j]) for i in range(n)) - abs(A[j][j]) for j in range(n))
 
     elif (p == 2):
 
-        if not (A.base_ring() == RR or A.base_ring() == CC):
-            return 1/2*max((A+A.H).eigenvalues())
+        if is_numpy:
+            raise NotImplementedError('the 2-norm is only implemented for Sage matrices')
+
+        # parents are unique in Sage, so an identity check avoids the coercion
+        # machinery involved in comparing rings with ==
+        base_ring = A.base_ring()
+        if base_ring is not RR and base_ring is not CC:
+            return max((A+A.H).eigenvalues())/2
         else:
-            # Alternative, always numerical
-            z = 1/2*max( np.linalg.eigvals( np.matrix(A+A.H, dtype=complex) ) )
-            return real_part(z) if imag_part(z) == 0 else z
+            # Alternative, always numerical. Since A+A^H is Hermitian its eigenvalues
+            # are real, and eigvalsh returns them as floats in increasing order
+            z = 0.5*np.linalg.eigvalsh( (A+A.H).numpy(dtype=complex) )[-1]
+            return RDF(z)
 
     else:
         raise NotImplementedError('value of p not understood or not implemented')
+
+#===============================================
+# Polyhedral operations
+#===============================================
+
+def polyhedron_sup_norm(P):
+    r"""
+    Maximum norm of any element in a polyhedron, with respect to the supremum norm.
+
+    INPUT:
+
+    - ``P`` -- an object of class Polyhedron, which should be bounded
+
+    OUTPUT:
+
+    The largest absolute value of the coordinates of the points in `P`, as a float.
+
+    NOTES:
+
+    Since the supremum norm is convex, for a compact polyhedron its maximum is
+    attained at a vertex. The vertices are already known to the polyhedron, hence
+    this avoids the `2n` linear programs solved by ``radius``.
+
+    EXAMPLES::
+
+        sage: from carlin.utils import polyhedron_sup_norm
+        sage: P = Polyhedron(vertices=[[-1, 0], [0, 2], [1/2, -3]])
+        sage: polyhedron_sup_norm(P)
+        3.0
+
+    The empty polyhedron has norm zero::
+
+        sage: polyhedron_sup_norm(Polyhedron(ambient_dim=2))
+        0.0
+
+    TESTS:
+
+    An unbounded polyhedron is not allowed::
+
+        sage: polyhedron_sup_norm(Polyhedron(rays=[[1, 0]]))
+        Traceback (most recent call last):
+        ...
+        ValueError: the initial set should be bounded
+    """
+    if P.is_empty():
+        return 0.0
+
+    if not P.is_compact():
+        raise ValueError('the initial set should be bounded')
+
+    return float(max(abs(vi) for vi in P.vertices_matrix().list()))